@@ -1,9 +1,10 @@
 import unittest
 from zippy.exceptions import *
 from zippy import ZipFile
+from zippy._base_classes import CHUNK_SIZE
 from zippy.constants import *
 
-from os import chdir, remove
+from os import chdir, path, remove
 from shutil import rmtree
 
 try:
@@ -32,6 +33,85 @@ class TestCase1(unittest.TestCase):
 
         self.assertRaises(WrongPassword, lambda: ZipFile.open('ZipEncrypted.zip', 'wrongpassword'))
 
+    def test_peek(self) -> None:
+        overflow = ' |...| File too large to display'
+        text = test_str + 'ж€😀'
+        encodings = ('utf-8', 'utf-16-le', 'utf-16', 'utf-32', 'utf-7', 'unicode_escape')
+        data = test_str.encode() + b'\xff'
+        z = ZipFile.new()
+        z.create_file('text.txt', text)
+        for encoding in encodings:
+            z.create_file(f'{encoding}.txt', text.encode(encoding))
+        z.create_file('invalid end.txt', data)
+        z.create_file('invalid start.txt', b'\xff' + data)
+        z.save('peek.zip')
+
+        try:
+            with ZipFile.open('peek.zip') as z:
+                self.assertEqual(text, z._files[0].peek(ignore_overflow=False, char_limit=len(text)))
+                for file, encoding in zip(z._files[1:], encodings):
+                    self.assertEqual(f'{text[:50]}{overflow}', file.peek(encoding, ignore_overflow=False, char_limit=100))
+
+                # Only the shown part of large file is decoded
+                self.assertEqual(data, z._files[-2].peek())
+                self.assertEqual(f'{test_str[:50]}{overflow}', z._files[-2].peek(ignore_overflow=False, char_limit=100))
+                self.assertEqual(b'\xff' + data[:2] + overflow.encode(), z._files[-1].peek(ignore_overflow=False, char_limit=100))
+        finally:
+            remove('peek.zip')
+
+    def test_verify_crc(self) -> None:
+        with ZipFile.open('deflate.zip') as z:
+            self.assertEqual([], z.verify_all())
+            z._files[0].crc ^= 1
+            self.assertFalse(z._files[0].verify_crc())
+            self.assertEqual([z._files[0].filename], z.verify_all())
+
+        z = ZipFile.new()
+        z.create_file('test.txt', b'TEXT')
+        z.save('crc.zip')
+
+        try:
+            with ZipFile.open('crc.zip') as z:
+                file = z._files[0]
+                self.assertTrue(file.verify_crc())
+                file.contents = b'TEST'
+                self.assertFalse(file.verify_crc())
+                file.crc = None
+                self.assertFalse(file.verify_crc())
+        finally:
+            remove('crc.zip')
+
+    def test_extract_large(self) -> None:
+        data = test_str.encode() * 4096  # Larger than STREAM_THRESHOLD, so it's decompressed in chunks
+        z = ZipFile.new()
+        z.create_file('large.txt', data, compression='Deflate')
+        z.save('large.zip')
+
+        try:
+            with ZipFile.open('large.zip') as z:
+                self.assertTrue(z._files[0].verify_crc())
+                self.assertTrue(all(len(chunk) <= CHUNK_SIZE for chunk in z._files[0].iter_contents()))
+                z.extract_all('large')
+            with open(path.join('large', 'large.txt'), 'rb') as f:
+                self.assertEqual(data, f.read())
+        finally:
+            remove('large.zip')
+            rmtree('large', ignore_errors=True)
+
+    def test_extract_corrupted(self) -> None:
+        z = ZipFile.new()
+        z.create_file('large.txt', test_str.encode() * 4096, compression='Deflate')
+        z.save('corrupted.zip')
+
+        try:
+            with ZipFile.open('corrupted.zip') as z:
+                z._files[0].crc ^= 1
+                self.assertRaises(BadFile, lambda: z.extract_all('corrupted'))
+            self.assertFalse(path.exists(path.join('corrupted', 'large.txt')))  # No partial file is left
+        finally:
+            remove('corrupted.zip')
+            rmtree('corrupted', ignore_errors=True)
+
     def test_exctract(self) -> None:  # This test should finish without exceptions (os exceptions mainly)
         with ZipFile.open('folders.zip') as z:
             z.extract_all()
@@ -39,7 +119,7 @@ class TestCase1(unittest.TestCase):
     def test_create_folder(self) -> None:
         z = ZipFile.new()
         z.create_folder('test1\\test2')
-        self.assertEqual(['test1/', 'test1/test2/'], list(z._files.keys()))
+        self.assertEqual(['test1/', 'test1/test2/'], [*z._files])
 
     def test_new(self) -> None:
         zipfile = ZipFile.new()
@@ -1,12 +1,94 @@
 from abc import abstractmethod, ABCMeta
-from dataclasses import dataclass
+from codecs import getincrementaldecoder, lookup
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields
 from datetime import datetime
-from os import PathLike, mkdir, sep
+from functools import cached_property
+from os import PathLike, cpu_count, fsdecode, makedirs, mkdir, remove, scandir, sep, close, write
+from os import O_WRONLY, O_CREAT, O_TRUNC, open as os_open
 from os import path as os_path
 from types import TracebackType
-from typing import Optional, Any, TextIO, BinaryIO, Self
+from typing import Optional, Any, Iterator, TextIO, BinaryIO, Self
+from zlib import crc32
+
+try:
+    from os import O_BINARY  # Windows only, files are opened in text mode otherwise
+except ImportError:
+    O_BINARY = 0
+
+from .exceptions import BadFile
+
+CHUNK_SIZE: int = 1_048_576  # 1 MiB
+_WRITE_FLAGS: int = O_WRONLY | O_CREAT | O_TRUNC | O_BINARY
+_SEP_TRANS: dict[int, str] = str.maketrans('/', sep)
+_OVERFLOW_MSG_STR: str = ' |...| File too large to display'
+_OVERFLOW_MSG_BYTES: bytes = b' |...| File too large to display'
+# Codecs (as named by codecs.lookup) that never take more than 4 bytes per character.
+# Plain utf-16 isn't here, its incremental decoder requires BOM unlike str().
+_BOUNDED_ENCODINGS: frozenset[str] = frozenset(('utf-8', 'utf-16-le', 'utf-16-be', 'ascii', 'iso8859-1'))
+
+def _make_folder(path: str) -> None:
+    """Create folder ``path`` if it doesn't exist. Missing parent folders are created as well."""
+    try:
+        mkdir(path)  # Single syscall when parent folder already exists
+    except FileExistsError:
+        if not os_path.isdir(path):
+            raise
+    except FileNotFoundError:
+        makedirs(path, exist_ok=True)
+
+def _worker_count(workers: Optional[int]) -> int:
+    """Get number of threads for ``workers`` argument. If it's None, thread count is based on CPU count."""
+    if workers is None:
+        return min(32, (cpu_count() or 1) * 4)
+    if workers < 1:
+        raise ValueError(f'Argument workers must be at least 1, got {workers}.')
+    return workers
+
+class BufferReader:
+    """Binary stream over data stored in memory. Used to parse archives that were read at once.
+
+    Works like ``io.BytesIO``, but ``read_view`` returns a part of the buffer without copying it.
+    Raises BadFile exception if fewer bytes than requested are left, so truncated archives
+    are reported the same way as other damaged ones.
+    """
+
+    def __init__(self, buffer: bytes | memoryview):
+        self._view: memoryview = memoryview(buffer)
+        self._position: int = 0
+
+    def read(self, size: int = -1) -> bytes:
+        return self.read_view(size).tobytes()
+
+    def read_view(self, size: int = -1) -> memoryview:
+        start: int = self._position
+        end: int = len(self._view) if size < 0 else start + size
+        if end > len(self._view):
+            raise BadFile('Unexpected end of file.')
+        self._position = end
+        return self._view[start:end]
+
+    def tell(self) -> int:
+        return self._position
+
+class Decoder(metaclass=ABCMeta):
+    """Decodes contents of a file from the data stored in the archive. Lets archive readers
+    leave decompression for the first access to the contents.
+
+    If ``stream`` is True, contents are extracted in chunks with ``iter_decode``.
+    """
+
+    stream: bool
 
-@dataclass
+    @abstractmethod
+    def decode(self, data: bytes | memoryview) -> bytes | memoryview:
+        """Decode the whole ``data`` at once."""
+
+    @abstractmethod
+    def iter_decode(self, data: bytes | memoryview) -> Iterator[bytes | memoryview]:
+        """Decode ``data`` in chunks."""
+
+@dataclass(slots=True)
 class File:
     """Final representation of the file.
 
@@ -19,10 +101,11 @@ class File:
         * compression_level (`str`): Level of compression.
         * last_mod_time (`datetime`, optional): Datetime of last modification of the file.
         None if time is not specified.
-        * crc (`int`): CRC of the file.
+        * crc (`int`, optional): CRC of the file. None if it's not specified.
         * compressed_size (`int`): Compressed size of the file.
         * uncompressed_size (`int`): Uncompressed size of the file.
-        * contents (`bytes`): Undecoded content of the file.
+        * contents (`bytes`): Undecoded content of the file. If the file was opened with
+        a decompressor, it is decompressed on first access.
         * specifications (`dict[Any, Any]`, optional): Miscelenious information about the
         file that may vary based on archive's structure.
     """
@@ -34,28 +117,141 @@ class File:
     compression_method: str
     compression_level: str
     last_mod_time: Optional[datetime]
-    crc: int
+    crc: Optional[int]
     compressed_size: int
     uncompressed_size: int
     contents: bytes
     comment: str = ''
     specifications: Optional[dict[Any, Any]] = None
+    # Data stored in the archive and its decoder, see _defer
+    _source: bytes | memoryview = field(default=b'', init=False, repr=False, compare=False)
+    _decoder: Optional[Decoder] = field(default=None, init=False, repr=False, compare=False)
+    _decoded_cache: dict[str, str | bytes] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _decoded_from: Optional[bytes | memoryview] = field(default=None, init=False, repr=False, compare=False)
+
+    @property
+    def _native_path(self) -> str:
+        """Filename with os separators. Nothing to replace on POSIX."""
+        return self.filename if sep == '/' else self.filename.translate(_SEP_TRANS)
+
+    def __getattr__(self, name: str) -> Any:
+        # Called only while contents are unset, see _defer
+        if name != 'contents':
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        data: bytes | memoryview = self._get_contents()
+        # Copied only when requested, peek and extract work with the view itself
+        self.contents = data = data if isinstance(data, bytes) else bytes(data)
+        return data
+
+    def __getstate__(self) -> dict[str, Any]:
+        # Views into the archive's buffer can't be pickled, so decoded contents are stored instead
+        return {f.name: getattr(self, f.name) for f in fields(self) if f.init}
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.__init__(**state)
+
+    def _defer(self, decoder: Decoder) -> None:
+        """Treat current contents as the data stored in the archive. They are decoded
+        with ``decoder`` on first access instead.
+        """
+        self._source = self.contents
+        self._decoder = decoder
+        del self.contents
+
+    def _loaded_contents(self) -> Optional[bytes]:
+        """Get contents if they were set or requested already, otherwise None."""
+        try:
+            return object.__getattribute__(self, 'contents')  # Doesn't fall back to __getattr__
+        except AttributeError:
+            return None
+
+    def _get_contents(self) -> bytes | memoryview:
+        """Get contents without copying them. Archive readers may store a view into the archive's buffer.
+
+        Raises BadFile exception if decoded contents don't match CRC.
+        """
+        data: Optional[bytes | memoryview] = self._loaded_contents()
+        if data is not None:
+            return data
+        if self._decoder is not None:
+            data = self._decoder.decode(self._source)
+            if crc32(data) != self.crc:
+                raise BadFile('File is corrupted or damaged.')
+            self._source = data
+            self._decoder = None
+        return self._source
+
+    def iter_contents(self) -> Iterator[bytes | memoryview]:
+        """Iterate over contents in chunks. Large compressed files are decompressed
+        on the fly, so the whole result is never kept in memory.
+
+        Raises BadFile exception after the last chunk if contents don't match CRC.
+        """
+        if self._decoder is not None and self._decoder.stream and self._loaded_contents() is None:
+            return self._check_stream(self._decoder.iter_decode(self._source))
+        view: memoryview = memoryview(self._get_contents())
+        return (view[offset:offset + CHUNK_SIZE] for offset in range(0, len(view), CHUNK_SIZE))
+
+    def _check_stream(self, chunks: Iterator[bytes | memoryview]) -> Iterator[bytes | memoryview]:
+        value: int = 0
+        for chunk in chunks:
+            value = crc32(chunk, value)
+            yield chunk
+        if value != self.crc:
+            raise BadFile('File is corrupted or damaged.')
 
     def extract(self, path: str | bytes | PathLike[str] | PathLike[bytes] = '.') -> None:
         """Extract file to given ``path``. If not specified, extracts to current working directory."""
 
-        if not os_path.exists(path):
-            # Folder to extract
-            mkdir(path)
-        path = os_path.join(str(path), self.filename).replace('/', sep)  # get final file path
+        path = os_path.join(fsdecode(path), self._native_path)  # get final file path
 
         if self.is_dir:
-            if not os_path.exists(path):
-                mkdir(path)
+            _make_folder(path)
         else:
-            # Write to file
-            with open(path, 'wb') as f:
-                f.write(self.contents)
+            # Create the whole chain of parent folders at once
+            _make_folder(os_path.dirname(path) or '.')
+            self._write_contents(path)
+
+    def _write_contents(self, path: str) -> None:
+        """Write contents to the file ``path``. Parent folder must already exist.
+        If contents turn out to be damaged, the file is removed and BadFile exception is raised.
+        """
+
+        # Chunks are large already, so they are written straight to the descriptor without a buffer
+        fd: int = os_open(path, _WRITE_FLAGS, 0o666)
+        try:
+            try:
+                for chunk in self.iter_contents():
+                    view = memoryview(chunk)
+                    while view:
+                        view = view[write(fd, view):]  # Write may be partial
+            finally:
+                close(fd)
+        except BaseException:
+            remove(path)  # Streamed contents are checked only after the last chunk is written
+            raise
+
+    def verify_crc(self) -> bool:
+        """Check if CRC of the contents matches the stored one.
+        Returns False if file has no CRC, since there is nothing to check contents against.
+        Use ``crc is None`` to tell such files apart from damaged ones.
+
+        Compressed contents are decompressed, but not kept. Large files are checked chunk by chunk.
+        """
+
+        if self.crc is None:
+            return False
+        data: Optional[bytes | memoryview] = self._loaded_contents()
+        if data is not None or self._decoder is None:
+            chunks: Iterator[bytes | memoryview] = iter((self._source if data is None else data,))
+        elif self._decoder.stream:
+            chunks = self._decoder.iter_decode(self._source)
+        else:
+            chunks = iter((self._decoder.decode(self._source),))
+        value: int = 0
+        for chunk in chunks:
+            value = crc32(chunk, value)
+        return value == self.crc
 
     def peek(
             self,
@@ -67,21 +263,51 @@ class File:
         """Decode file content. If decoding with given ``encoding`` failed, byte representation will be used instead.
 
         If ``ignore_overflow`` is set to False, content that exceeds
-        ``char_limit`` characters (bytes) will be partially shown.
+        ``char_limit`` characters (bytes) will be partially shown. In that case only the shown part
+        of a large file is decoded, so invalid bytes after it don't make the result bytes.
         """
 
-        try:
-            data: str | bytes = self.contents.decode(encoding)
-        except UnicodeDecodeError:
-            data = self.contents
-
-        if len(data) > char_limit and not ignore_overflow:
+        # Buffer is decoded in place, so memoryview contents aren't copied
+        contents: bytes | memoryview = self._get_contents()
+        if contents is not self._decoded_from:  # Contents were replaced
+            self._decoded_cache.clear()
+            self._decoded_from = contents
+        # Checked before the cache, so the result doesn't depend on earlier calls
+        if not ignore_overflow and len(contents) > char_limit * 4 and lookup(encoding).name in _BOUNDED_ENCODINGS:
+            preview: Optional[str | bytes] = self._peek_large(contents, encoding, char_limit)
+            if preview is not None:
+                return preview
+        data: str | bytes | None = self._decoded_cache.get(encoding)
+        if data is None:
+            try:
+                data = str(contents, encoding)
+            except UnicodeDecodeError:
+                data = bytes(contents)
+            self._decoded_cache[encoding] = data
+
+        if not ignore_overflow and len(data) > char_limit:
             if isinstance(data, str):
-                return data[:char_limit // 2] + ' |...| File too large to display'
-            return bytes(data[:char_limit // 32]) + b' |...| File too large to display'
+                return f'{data[:char_limit // 2]}{_OVERFLOW_MSG_STR}'
+            return b''.join((data[:char_limit // 32], _OVERFLOW_MSG_BYTES))
 
         return data
 
+    @staticmethod
+    def _peek_large(contents: bytes | memoryview, encoding: str, char_limit: int) -> Optional[str | bytes]:
+        """Show the beginning of ``contents`` that is too large to display, the same way ``peek`` does.
+        Returns None if the beginning doesn't exceed ``char_limit`` characters.
+
+        Only the beginning is decoded, so bytes after it are never checked.
+        """
+
+        try:
+            data: str = getincrementaldecoder(encoding)().decode(contents[:char_limit * 4 + 4])
+        except UnicodeDecodeError:
+            return b''.join((contents[:char_limit // 32], _OVERFLOW_MSG_BYTES))
+        if len(data) <= char_limit:
+            return None
+        return f'{data[:char_limit // 2]}{_OVERFLOW_MSG_STR}'
+
 class NewArchive(metaclass=ABCMeta):
     """Class with methods that should be implemented in any new archive."""
 
@@ -118,6 +344,22 @@ class NewArchive(metaclass=ABCMeta):
     @property
     def encryption(self) -> str:
         return self._encryption
+
+    @staticmethod
+    def _coerce_contents(contents: str | bytes | TextIO | BinaryIO, encoding: str) -> bytes:
+        """Convert ``contents`` into bytes. Text is encoded with given ``encoding``.
+
+        Implementations of ``create_file`` should call it once and work with bytes afterwards.
+        """
+
+        if isinstance(contents, str):
+            return contents.encode(encoding)
+        if isinstance(contents, (bytes, bytearray, memoryview)):
+            return bytes(contents)
+        if hasattr(contents, 'read'):
+            data: str | bytes = contents.read()
+            return data.encode(encoding) if isinstance(data, str) else data
+        raise TypeError(f"Expected argument content to be str, bytes, io.TextIO or io.BinaryIO, not {type(contents).__name__}.")
     
     @abstractmethod
     def get_files(self, encoding: str = 'utf-8') -> dict[str, File]:
@@ -218,8 +460,27 @@ class NewArchive(metaclass=ABCMeta):
 
         If ``use_mp`` is True, all CPU cores will be used to add large amount of files faster.
         Note that to use this, you must use main idiom.
+
+        Implementations should walk ``source`` with ``_iter_tree`` to avoid extra stat calls.
         """
 
+    @staticmethod
+    def _iter_tree(source: str, prefix: str = '') -> Iterator[tuple[str, str, bool]]:
+        """Recursively walk folder ``source`` using ``os.scandir``.
+
+        Yields path of every entry, its path relative to ``source`` (starting with ``prefix``)
+        and whether it's a folder. Folders come before their child files.
+        """
+
+        with scandir(source) as entries:
+            for entry in entries:
+                relative_path: str = prefix + entry.name
+                if entry.is_dir():
+                    yield entry.path, relative_path, True
+                    yield from NewArchive._iter_tree(entry.path, relative_path + sep)
+                else:
+                    yield entry.path, relative_path, False
+
     @abstractmethod
     def add_from_archive(
             self,
@@ -276,13 +537,6 @@ class Archive(metaclass=ABCMeta):
         self._total_entries: int = total_entries
         self._encoding: str = encoding
 
-        compression_method: str = next((file.compression_method for file in files if file.filename[-1] != '/'), files[0].compression_method)
-        self._compression_method: str = 'Mixed' if any(
-            compression_method != f.compression_method and f.filename[-1] != '/' for f in files
-        ) else compression_method
-
-        self._encryption_method: str = next((file.encryption_method for file in files if file.filename[-1] != '/'), files[0].encryption_method)
-
     def __enter__(self) -> Self:
         return self
 
@@ -293,14 +547,26 @@ class Archive(metaclass=ABCMeta):
         exc_traceback: TracebackType | None,
     ) -> None:
         pass
-    
-    @property
+
+    # Both methods are computed on first access, since it takes a pass over all files.
+    # Folders are skipped since they are always stored.
+    @cached_property
+    def _compression_methods(self) -> list[str]:
+        """Compression methods of all files except folders, in the same order."""
+        return [file.compression_method for file in self._files if not file.is_dir]
+
+    @cached_property
     def compression_method(self) -> str:
-        return self._compression_method
-    
-    @property
+        methods: list[str] = self._compression_methods
+        if not methods:
+            return self._files[0].compression_method
+        first: str = methods[0]
+        # Stops on the first mismatch
+        return 'Mixed' if any(method != first for method in methods) else first
+
+    @cached_property
     def encryption_method(self) -> str:
-        return self._encryption_method
+        return next((file.encryption_method for file in self._files if not file.is_dir), self._files[0].encryption_method)
 
     @property
     def comment(self) -> str:
@@ -351,11 +617,52 @@ class Archive(metaclass=ABCMeta):
 
     def extract_all(
             self,
-            path: str | bytes | PathLike[str] | PathLike[bytes] = '.'
+            path: str | bytes | PathLike[str] | PathLike[bytes] = '.',
+            *,
+            workers: Optional[int] = None
     ) -> None:
-        """Extract all files to given ``path``. If not specified, extracts to current working directory."""
+        """Extract all files to given ``path``. If not specified, extracts to current working directory.
+
+        Files are written in ``workers`` threads. Set it to 1 to write files one by one.
+        Raises ValueError if ``workers`` is less than 1.
+        """
+        max_workers: int = _worker_count(workers)
+        # Base path is joined once, so file paths are built by plain concatenation
+        base: str = os_path.join(fsdecode(path), '')
+        folders: set[str] = set()
+        files: list[tuple[File, str]] = []
         for file in self._files:
-            file.extract(path)
+            file_path: str = base + file._native_path
+            # Folders are normalized, so ones with and without trailing separator aren't counted twice
+            if file.is_dir:
+                folders.add(os_path.normpath(file_path))
+            else:
+                folders.add(os_path.normpath(os_path.dirname(file_path)))
+                files.append((file, file_path))
+
+        # Parent folders go first, so every folder is created only once
+        for folder in sorted(folders, key=lambda folder: folder.count(sep)):
+            _make_folder(folder)
+
+        # Folders already exist at this point, so writes don't race each other
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Results are iterated, so exceptions from the threads are raised here
+            for _ in executor.map(lambda item: item[0]._write_contents(item[1]), files):
+                pass
+
+    def verify_all(self, workers: Optional[int] = None) -> list[str]:
+        """Check CRC of all files. Returns paths of the files that are damaged.
+        Files without CRC are skipped.
+
+        Files are checked in ``workers`` threads, the same as in ``extract_all``.
+        Raises ValueError if ``workers`` is less than 1.
+        """
+        max_workers: int = _worker_count(workers)
+        files: list[File] = [file for file in self._files if file.crc is not None]
+        # crc32 and decompressors release the GIL, so large files are checked in parallel
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results: Iterator[bool] = executor.map(File.verify_crc, files)
+            return [file._native_path for file, valid in zip(files, results) if not valid]
 
     def get_files(
             self,
@@ -373,8 +680,8 @@ class Archive(metaclass=ABCMeta):
         If ``ignore_overflow`` is set to False, content that exceeds ``char_limit``
         characters (bytes) will be partially shown.
         """
-        files = {}
-        for file in self._files:
-            if not file.is_dir or include_folders:
-                files[file.filename.replace('/', sep)] = file.peek(encoding, ignore_overflow=ignore_overflow, char_limit=char_limit)
-        return files
+        peek = File.peek
+        return {
+            file._native_path: peek(file, encoding, ignore_overflow=ignore_overflow, char_limit=char_limit)
+            for file in self._files if include_folders or not file.is_dir
+        }
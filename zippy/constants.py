@@ -31,3 +31,5 @@ ZIP_COMPRESSION_FROM_STR: dict[ZipCompressions, int] = {
     'Zstandart': 93,
     'XZ': 95
 }
+
+ZIP_COMPRESSION_FROM_INT: dict[int, ZipCompressions] = {v: k for k, v in ZIP_COMPRESSION_FROM_STR.items()}
@@ -1,29 +1,90 @@
 from dataclasses import dataclass
 from datetime import datetime
-from typing import BinaryIO, Optional
+from struct import Struct
+from typing import NamedTuple, Optional
 
-from .._base_classes import File
+from .._base_classes import BufferReader, File
 from ..exceptions import BadFile
 
-def u_LEB128(r: BinaryIO) -> int:
+UINT32: Struct = Struct('<I')
+
+def u_LEB128(r: BufferReader) -> int:
     """Decode the unsigned leb128 encoded bytes from a reader."""
-    a = bytearray()
-    while True:
-        b = r.read(1)
-        if len(b) != 1:
-            raise EOFError
-        b = ord(b)
-        a.append(b)
-        if (b & 0x80) == 0:
-            break
-    
-    def decode(b: bytearray) -> int:
-        """Decode the unsigned leb128 encoded bytearray."""
-        r = 0
-        for i, e in enumerate(b):
-            r += (e & 0x7f) << (i * 7)
-        return r
-    return decode(a)
+    # Value is assembled while reading, so bytes are never stored or walked twice
+    result: int = 0
+    for shift in range(0, 70, 7):  # RAR limits numbers to 10 bytes
+        byte: int = r.read_view(1)[0]
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result
+    raise BadFile('Variable length integer is too long.')
+
+class _FileFields(NamedTuple):
+    """Fields shared by file and service headers."""
+    h_flags: int
+    f_flags: int
+    size: int
+    attributes: int
+    cmp_information: int
+    host_os: int
+    name_length: int
+    name: str
+    extra_area_size: Optional[int]
+    extra_area: Optional[bytes]
+    data_size: Optional[int]
+    data_crc32: Optional[int]
+    data: Optional[bytes]
+    mtime: Optional[int]
+
+def _read_file_fields(f: BufferReader) -> _FileFields:
+    """Read fields shared by file and service headers."""
+    h_flags: int = u_LEB128(f)
+    if h_flags & 0x0001:
+        extra_area_size: Optional[int] = u_LEB128(f)
+    else:
+        extra_area_size = None
+    if h_flags & 0x0002:
+        data_size: Optional[int] = u_LEB128(f)
+    else:
+        data_size = None
+    f_flags: int = u_LEB128(f)
+    size: int = u_LEB128(f)
+    attributes: int = u_LEB128(f)
+    # Modification time and CRC32 are the only fixed size fields and follow each other
+    has_mtime: bool = bool(f_flags & 0x0002)
+    has_crc32: bool = bool(f_flags & 0x0004)
+    fixed: memoryview = f.read_view(4 * (has_mtime + has_crc32))
+    mtime: Optional[int] = UINT32.unpack_from(fixed)[0] if has_mtime else None
+    data_crc32: Optional[int] = UINT32.unpack_from(fixed, 4 * has_mtime)[0] if has_crc32 else None
+    cmp_information: int = u_LEB128(f)
+    host_os: int = u_LEB128(f)
+    name_length: int = u_LEB128(f)
+    name: str = f.read(name_length).decode('utf-8')
+    if extra_area_size is not None:
+        extra_area: Optional[bytes] = f.read(extra_area_size)
+    else:
+        extra_area = None
+    if data_size is not None:
+        data: Optional[bytes] = f.read(data_size)
+    else:
+        data = None
+
+    return _FileFields(
+        h_flags=h_flags,
+        f_flags=f_flags,
+        size=size,
+        attributes=attributes,
+        cmp_information=cmp_information,
+        host_os=host_os,
+        name_length=name_length,
+        name=name,
+        extra_area_size=extra_area_size,
+        extra_area=extra_area,
+        data_size=data_size,
+        data_crc32=data_crc32,
+        data=data,
+        mtime=mtime
+    )
 
 @dataclass
 class MainHeader:
@@ -33,7 +94,7 @@ class MainHeader:
     extra_area: Optional[bytes]
 
     @staticmethod
-    def __init_raw__(f: BinaryIO) -> 'MainHeader':
+    def __init_raw__(f: BufferReader) -> 'MainHeader':
         """Initialise from a stream."""
         h_flags = u_LEB128(f)
         if h_flags & 0x0001:
@@ -75,56 +136,24 @@ class FileHeader:
     mtime: Optional[int]
     
     @staticmethod
-    def __init_raw__(f: BinaryIO) -> 'FileHeader':
+    def __init_raw__(f: BufferReader) -> 'FileHeader':
         """Initialise from a stream."""
-        h_flags: int = u_LEB128(f)
-        if h_flags & 0x0001:
-            extra_area_size: Optional[int] = u_LEB128(f)
-        else:
-            extra_area_size = None
-        if h_flags & 0x0002:
-            data_size: Optional[int] = u_LEB128(f)
-        else:
-            data_size = None
-        f_flags: int = u_LEB128(f)
-        compressed_size: int = u_LEB128(f)
-        attributes: int = u_LEB128(f)
-        if f_flags & 0x0002:
-            mtime: Optional[int] = int.from_bytes(f.read(4), 'little')
-        else:
-            mtime = None
-        if f_flags & 0x0004:
-            data_crc32: Optional[int] = int.from_bytes(f.read(4), 'little')
-        else:
-            data_crc32 = None
-        cmp_information: int = u_LEB128(f)
-        host_os: int = u_LEB128(f)
-        name_length: int = u_LEB128(f)
-        name: str = f.read(name_length).decode('utf-8')
-        if extra_area_size is not None:
-            extra_area: Optional[bytes] = f.read(extra_area_size)
-        else:
-            extra_area = None
-        if data_size is not None:
-            data: Optional[bytes] = f.read(data_size)
-        else:
-            data = None
-        
+        fields: _FileFields = _read_file_fields(f)
         return FileHeader(
-            h_flags,
-            f_flags,
-            compressed_size,
-            attributes,
-            cmp_information,
-            host_os,
-            name_length,
-            name,
-            extra_area_size,
-            extra_area,
-            data_size,
-            data_crc32,
-            data,
-            mtime
+            h_flags=fields.h_flags,
+            f_flags=fields.f_flags,
+            compressed_size=fields.size,
+            attributes=fields.attributes,
+            cmp_information=fields.cmp_information,
+            host_os=fields.host_os,
+            filename_length=fields.name_length,
+            filename=fields.name,
+            extra_area_size=fields.extra_area_size,
+            extra_area=fields.extra_area,
+            data_size=fields.data_size,
+            data_crc32=fields.data_crc32,
+            data=fields.data,
+            mtime=fields.mtime
         )
     
     def decode(self):
@@ -169,56 +198,24 @@ class ServiceHeader:
     mtime: Optional[int]
     
     @staticmethod
-    def __init_raw__(f: BinaryIO) -> 'ServiceHeader':
+    def __init_raw__(f: BufferReader) -> 'ServiceHeader':
         """Initialise from a stream."""
-        h_flags: int = u_LEB128(f)
-        if h_flags & 0x0001:
-            extra_area_size: Optional[int] = u_LEB128(f)
-        else:
-            extra_area_size = None
-        if h_flags & 0x0002:
-            data_size: Optional[int] = u_LEB128(f)
-        else:
-            data_size = None
-        f_flags: int = u_LEB128(f)
-        unpacked_size: int = u_LEB128(f)
-        attributes: int = u_LEB128(f)
-        if f_flags & 0x0002:
-            mtime: Optional[int] = int.from_bytes(f.read(4), 'little')
-        else:
-            mtime = None
-        if f_flags & 0x0004:
-            data_crc32: Optional[int] = int.from_bytes(f.read(4), 'little')
-        else:
-            data_crc32 = None
-        cmp_information: int = u_LEB128(f)
-        host_os: int = u_LEB128(f)
-        name_length: int = u_LEB128(f)
-        name: str = f.read(name_length).decode('utf-8')
-        if extra_area_size is not None:
-            extra_area: Optional[bytes] = f.read(extra_area_size)
-        else:
-            extra_area = None
-        if data_size is not None:
-            data: Optional[bytes] = f.read(data_size)
-        else:
-            data = None
-        
+        fields: _FileFields = _read_file_fields(f)
         return ServiceHeader(
-            h_flags,
-            f_flags,
-            unpacked_size,
-            attributes,
-            cmp_information,
-            host_os,
-            name_length,
-            name,
-            extra_area_size,
-            extra_area,
-            data_size,
-            data_crc32,
-            data,
-            mtime
+            h_flags=fields.h_flags,
+            f_flags=fields.f_flags,
+            unpacked_size=fields.size,
+            attributes=fields.attributes,
+            cmp_information=fields.cmp_information,
+            host_os=fields.host_os,
+            name_length=fields.name_length,
+            name=fields.name,
+            extra_area_size=fields.extra_area_size,
+            extra_area=fields.extra_area,
+            data_size=fields.data_size,
+            data_crc32=fields.data_crc32,
+            data=fields.data,
+            mtime=fields.mtime
         )
 
 @dataclass
@@ -227,7 +224,7 @@ class EOAHeader:
     EOA_flags: int
 
     @staticmethod
-    def __init_raw__(f: BinaryIO):
+    def __init_raw__(f: BufferReader):
         """Initialise from a stream."""
         h_flags: int = u_LEB128(f)
         EOA_flags: int = u_LEB128(f)
@@ -3,10 +3,10 @@
 from os import PathLike
 from typing import BinaryIO, Optional
 
-from .._base_classes import Archive, File, NewArchive
+from .._base_classes import Archive, BufferReader, File, NewArchive
 from ..constants import *
 from ..exceptions import *
-from ._rarfile import u_LEB128, MainHeader, FileHeader, ServiceHeader, EOAHeader
+from ._rarfile import u_LEB128, UINT32, MainHeader, FileHeader, ServiceHeader, EOAHeader
 
 INT32_MAX: int = 4_294_967_295
 ILLEGAL_CHARS: list[str] = [
@@ -41,49 +41,47 @@ class RarFile(Archive):
         indirect: bool = False
 
         if isinstance(f, (int, str, bytes, PathLike)):
-            f = open(f, 'rb')
+            f = open(f, 'rb', buffering=0)  # Read once, so no extra buffer is needed
             indirect = True
         elif not isinstance(f, BinaryIO):
             raise TypeError(f"Expected argument f to be int, str, bytes or os.PathLike object, got '{type(f).__name__}' instead.")
         
-        self_extract_bytes: bytes = b''
-        i: int = 0
-        while b'Rar!\x1a\x07\x01\x00' not in self_extract_bytes:
-            byte = f.read(1)
-            self_extract_bytes += byte
-            i += 1
-            if i == 1_048_577 or byte == b'':  # 1 mb
-                raise BadFile('File is not in .RAR format.')
-        self_extract_bytes = self_extract_bytes[:-8]
-
+        # Archive is read at once so headers are parsed from memory, not byte by byte from the file
         try:
-            while True:
-                h_crc: int = int.from_bytes(f.read(4), 'little')
-                h_size: int = u_LEB128(f)
-                h_type: int = u_LEB128(f)
-            
-                match h_type:
-                    case 1:
-                        main_header: MainHeader = MainHeader.__init_raw__(f)
-                    case 2:
-                        f_header: FileHeader = FileHeader.__init_raw__(f)
-                        file_headers.append(f_header)
-                        files.append(f_header.decode())
-                    case 3:
-                        s_header: ServiceHeader = ServiceHeader.__init_raw__(f)
-                        service_headers.append(s_header)
-                    case 4:
-                        pass
-                    case 5:
-                        EOA_header: EOAHeader = EOAHeader.__init_raw__(f)
-                        break
-                    case _:
-                        raise BadFile(f"Unknown header type '{h_type}'.")
-
+            buffer: bytes = f.read()
         finally:
             if indirect:
                 f.close()
-        
+
+        magic_offset: int = buffer.find(b'Rar!\x1a\x07\x01\x00', 0, 1_048_576)  # 1 mb
+        if magic_offset == -1:
+            raise BadFile('File is not in .RAR format.')
+        self_extract_bytes: bytes = buffer[:magic_offset]
+        reader = BufferReader(memoryview(buffer)[magic_offset + 8:])
+
+        while True:
+            h_crc: int = UINT32.unpack(reader.read_view(4))[0]
+            h_size: int = u_LEB128(reader)
+            h_type: int = u_LEB128(reader)
+
+            match h_type:
+                case 1:
+                    main_header: MainHeader = MainHeader.__init_raw__(reader)
+                case 2:
+                    f_header: FileHeader = FileHeader.__init_raw__(reader)
+                    file_headers.append(f_header)
+                    files.append(f_header.decode())
+                case 3:
+                    s_header: ServiceHeader = ServiceHeader.__init_raw__(reader)
+                    service_headers.append(s_header)
+                case 4:
+                    pass
+                case 5:
+                    EOA_header: EOAHeader = EOAHeader.__init_raw__(reader)
+                    break
+                case _:
+                    raise BadFile(f"Unknown header type '{h_type}'.")
+
         return RarFile(files, '', len(files), encoding)
     
     @staticmethod
@@ -1,9 +1,9 @@
-import xz
-import bz2
-import deflate
-import zstandard
+from functools import cache
+from importlib import import_module
 from os import urandom
-from typing import Optional
+from threading import local
+from typing import Optional, Callable, Any, Iterator
+from zlib import decompressobj
 
 from .utils import pwexplode
 from .utils import LZ77 as LZ77_module
@@ -11,14 +11,23 @@ from .utils.ZipEncrypt import ZipDecrypter, ZipEncrypter
 from ..constants import *
 from ..exceptions import *
 
-def decrypt(bit_flag: str, v: int, crc: int, pwd: Optional[str], data: bytes) -> tuple[str, bytes]:
-    """Decrypt ``data``.
-    Returns tuple with first element being encryption method and second being decrypted data.
+def start_decryption(
+        encrypted: bool,
+        v: int,
+        crc: int,
+        pwd: Optional[str],
+        data: bytes | memoryview
+) -> tuple[str, bytes | memoryview, Optional[ZipDecrypter]]:
+    """Check the password by decrypting encryption header of ``data``.
+    Returns tuple with encryption method, data without encryption header and decrypter
+    that continues after the header. Decrypter is None if data isn't encrypted.
+
+    The rest of the data is decrypted later together with decompression.
     """
 
-    if bit_flag[0] == '0':
+    if not encrypted:
         encryption_method = 'Unencrypted'
-        return encryption_method, data
+        return encryption_method, data, None
     else:
         if not pwd:
             raise WrongPassword('Zip file requires password to be unpacked.')
@@ -28,14 +37,13 @@ def decrypt(bit_flag: str, v: int, crc: int, pwd: Optional[str], data: bytes) ->
 
         encryption_method = 'ZipCrypto'
         zd = ZipDecrypter(pwd)
-        decrypted_content = list(map(zd, data))
-        decryption_header = decrypted_content[:12]
+        decryption_header: bytearray = zd.decrypt(data[:12])
 
         # Each encrypted file has an extra 12 bytes stored at the start
         # of the data area defining the encryption header for that file. The
         # encryption header is originally set to random values, and then
         # itself encrypted, using three, 32-bit keys.
-        if int.from_bytes(decryption_header[-1], 'little') != crc.to_bytes(4, 'little')[-1]:
+        if decryption_header[11] != crc >> 24:
             # After the header is decrypted,  the last 1 or 2 bytes in Buffer
             # SHOULD be the high-order word/byte of the CRC for the file being
             # decrypted, stored in Intel low-byte/high-byte order.  Versions of
@@ -45,7 +53,7 @@ def decrypt(bit_flag: str, v: int, crc: int, pwd: Optional[str], data: bytes) ->
 
             raise WrongPassword('Given password is incorrect.')
 
-        return encryption_method, b"".join(decrypted_content[12:])
+        return encryption_method, memoryview(data)[12:], zd
 
 def encrypt(data: bytes, pwd: Optional[str], crc: int) -> bytes:
     """Encrypt ``data``. Returns encrypted data."""
@@ -55,90 +63,181 @@ def encrypt(data: bytes, pwd: Optional[str], crc: int) -> bytes:
     
     ze = ZipEncrypter(pwd)
     check_byte = crc.to_bytes(4, 'little')[-1]
-    encryption_header = b"".join(map(ze, urandom(11) + check_byte.to_bytes(1, 'little')))
-    return encryption_header + b"".join(map(ze, data))
+    encrypted: bytearray = ze.encrypt(urandom(11) + check_byte.to_bytes(1, 'little'))
+    encrypted += ze.encrypt(data)
+    return bytes(encrypted)
+
+@cache
+def _load(module: str, name: str) -> Callable[..., Any]:
+    """Get function ``name`` from ``module``. Modules of the codecs are imported on first use,
+    so opening an archive only loads the ones it needs.
+    """
+    return getattr(import_module(module), name)
+
+# Decompression contexts can't be shared between threads
+_thread_data = local()
+
+def _zstd_decompressor() -> Any:
+    """Get zstandard decompressor of current thread. Its context is reused for every file."""
+    decompressor = getattr(_thread_data, 'zstd', None)
+    if decompressor is None:
+        decompressor = _thread_data.zstd = _load('zstandard', 'ZstdDecompressor')()
+    return decompressor
+
+def _zstd_compressor() -> Any:
+    """Get zstandard compressor of current thread. Its context is reused for every file."""
+    compressor = getattr(_thread_data, 'zstd_compressor', None)
+    if compressor is None:
+        compressor = _thread_data.zstd_compressor = _load('zstandard', 'ZstdCompressor')()
+    return compressor
+
+UNSUPPORTED_METHODS: dict[int, tuple[type[Exception], str]] = {
+    **dict.fromkeys(range(1, 6), (NotImplementedError, 'Shrinking and Reducing are not implemented yet.')),
+    6: (Deprecated, 'Legacy Implode is no longer supported. Use PKWARE Data Compression Library Imploding instead.'),
+    7: (Deprecated, 'Tokenizing is not used by PKZIP.'),
+    11: (ReservedValue, 'Compression method 11 is reserved.'),
+    13: (ReservedValue, 'Compression method 13 is reserved.')
+}
+
+DECOMPRESSORS: dict[ZipCompressions, Callable[[bytes, int], bytes]] = {
+    'Deflate': lambda data, size: _load('deflate', 'deflate_decompress')(data, size),
+    'Deflate64': lambda data, size: _load('deflate', 'deflate_decompress')(data, size),
+    'PKWARE Imploding': lambda data, size: pwexplode.explode(data),  # Untested
+    'BZIP2': lambda data, size: _load('bz2', 'decompress')(data),
+    'LZ77': lambda data, size: LZ77_module.decompress(data),  # Untested
+    'Zstandart': lambda data, size: _zstd_decompressor().decompress(data, max_output_size=size),
+    'XZ': lambda data, size: _load('xz', 'decompress')(data)
+}
+
+def _iter_deflate(chunks: Iterator[bytes | memoryview], size: int) -> Iterator[bytes]:
+    decompressor = decompressobj(-15)  # Raw deflate stream
+    for chunk in chunks:
+        while chunk:
+            # Input that didn't fit into ``size`` bytes of output is kept in unconsumed_tail
+            out: bytes = decompressor.decompress(chunk, size)
+            chunk = decompressor.unconsumed_tail
+            if out:
+                yield out
+    out = decompressor.flush()
+    if out:
+        yield out
+
+def _iter_bzip2(chunks: Iterator[bytes | memoryview], size: int) -> Iterator[bytes]:
+    decompressor = _load('bz2', 'BZ2Decompressor')()
+    for chunk in chunks:
+        out: bytes = decompressor.decompress(chunk, size)
+        while True:
+            if out:
+                yield out
+            # Input that didn't fit into ``size`` bytes of output is buffered by decompressor
+            if decompressor.needs_input or decompressor.eof:
+                break
+            out = decompressor.decompress(b'', size)
+
+class _ChunkReader:
+    """Readable stream over an iterator of chunks."""
+
+    def __init__(self, chunks: Iterator[bytes | memoryview]):
+        self._chunks: Iterator[bytes | memoryview] = chunks
+        self._chunk: memoryview = memoryview(b'')
+
+    def read(self, size: int = -1) -> bytes:
+        if not self._chunk:
+            self._chunk = memoryview(next(self._chunks, b''))
+        if size < 0:
+            size = len(self._chunk)
+        data: memoryview = self._chunk[:size]
+        self._chunk = self._chunk[size:]
+        return data.tobytes()
+
+def _iter_zstd(chunks: Iterator[bytes | memoryview], size: int) -> Iterator[bytes]:
+    decompressor = _load('zstandard', 'ZstdDecompressor')()
+    yield from decompressor.read_to_iter(_ChunkReader(chunks), read_size=size, write_size=size)
+
+# Methods that can be decompressed in chunks. Each function takes an iterator of compressed chunks
+# and size limit, and yields decompressed chunks that don't exceed it.
+STREAM_DECOMPRESSORS: dict[ZipCompressions, Callable[[Iterator[bytes | memoryview], int], Iterator[bytes]]] = {
+    'Deflate': _iter_deflate,
+    'BZIP2': _iter_bzip2,
+    'Zstandart': _iter_zstd
+}
 
-def decompress(compression_method: int, uncompressed_size: int, data: bytes) -> tuple[ZipCompressions, bytes]:
+def get_compression_method(compression_method: int) -> ZipCompressions:
+    """Get name of the compression method.
+    Raises an exception if method is unknown or not supported.
+    """
+
+    method = ZIP_COMPRESSION_FROM_INT.get(compression_method)
+    if method is not None:
+        return method
+    if compression_method in UNSUPPORTED_METHODS:
+        exception, message = UNSUPPORTED_METHODS[compression_method]
+        raise exception(message)
+    raise BadFile('Unknown file compression method.')
+
+def decompress(compression_method: int, uncompressed_size: int, data: bytes | memoryview) -> tuple[ZipCompressions, bytes | memoryview]:
     """Decompress ``contents``.
     Returns tuple with first element being compression method and second being decompressed data.
     """
 
-    method: ZipCompressions
-    if compression_method == 0:
-        method = 'Stored'
-    elif compression_method in range(1, 6):
-        raise NotImplementedError('Shrinking and Reducing are not implemented yet.')
-    elif compression_method == 6:
-        raise Deprecated('Legacy Implode is no longer supported. Use PKWARE Data Compression Library Imploding instead.')
-    elif compression_method == 7:
-        raise Deprecated('Tokenizing is not used by PKZIP.')
-    elif compression_method == 8:
-        method = 'Deflate'
-        data = deflate.deflate_decompress(data, uncompressed_size)
-    elif compression_method == 9:
-        method = 'Deflate64'
-        data = deflate.deflate_decompress(data, uncompressed_size)
-    elif compression_method == 10:
-        method = 'PKWARE Imploding'
-        data = pwexplode.explode(data)  # Untested
-    elif compression_method == 11:
-        raise ReservedValue('Compression method 11 is reserved.')
-    elif compression_method == 12:
-        method = 'BZIP2'
-        data = bz2.decompress(data)
-    elif compression_method == 13:
-        raise ReservedValue('Compression method 13 is reserved.')
-    #elif compression_method == 14:
-        #method = 'LZMA'
-        #data = b''
-    elif compression_method == 19:
-        method = 'LZ77'
-        data = LZ77_module.decompress(data)  # Untested
-    elif compression_method == 93:
-        method = 'Zstandart'
-        data = zstandard.decompress(data)
-    elif compression_method == 95:
-        method = 'XZ'
-        data = xz.decompress(data)
-    else:
-        raise BadFile('Unknown file compression method.')
+    method = get_compression_method(compression_method)
+    if method != 'Stored':
+        # Not every decompressor accepts memoryview
+        data = DECOMPRESSORS[method](bytes(data), uncompressed_size)
 
     return method, data
 
+def iter_decompress(
+        method: ZipCompressions,
+        data: bytes | memoryview,
+        chunk_size: int,
+        decrypter: Optional[ZipDecrypter] = None
+) -> Iterator[bytes | memoryview]:
+    """Decompress ``data`` in chunks of ``chunk_size`` compressed bytes.
+    Decompressed chunks don't exceed ``chunk_size`` bytes either.
+    Only 'Stored' and methods from ``STREAM_DECOMPRESSORS`` are supported.
+
+    If ``decrypter`` is given, every chunk is decrypted right before it's decompressed.
+    """
+
+    view: memoryview = memoryview(data)
+    chunks: Iterator[bytes | memoryview] = (view[offset:offset + chunk_size] for offset in range(0, len(view), chunk_size))
+    if decrypter is not None:
+        chunks = map(decrypter.decrypt, chunks)
+    if method != 'Stored':
+        chunks = STREAM_DECOMPRESSORS[method](chunks, chunk_size)
+    for chunk in chunks:
+        if chunk:
+            yield chunk
+
+DEFLATE_LEVELS: dict[ZipLevels, int] = {
+    'Fast': 3,
+    'Normal': 6,
+    'Maximum': 12
+}
+
+def _deflate(data: bytes, level: ZipLevels) -> bytes:
+    if level not in DEFLATE_LEVELS:
+        raise ValueError(f'Unknown compression level {level}.')
+    return _load('deflate', 'deflate_compress')(data, DEFLATE_LEVELS[level])
+
+# Methods without an entry are stored as is
+COMPRESSORS: dict[int, Callable[[bytes, ZipLevels], bytes]] = {
+    8: _deflate,
+    9: _deflate,
+    # 10: lambda data, level: pwexplode.explode(data),  # Untested
+    12: lambda data, level: _load('bz2', 'compress')(data),
+    # 14: LZMA doesn't work for some reason. Also don't know how to make it to use EOS.
+    # 19: lambda data, level: LZ77_module.compress(data),  # Untested
+    93: lambda data, level: _zstd_compressor().compress(data),
+    95: lambda data, level: _load('xz', 'compress')(data)
+    # 98: PPMd doesn't work. Docs says that only version I, Rev 1 of PPMd is supported
+}
+
 def compress(method: int, level: ZipLevels, data: bytes) -> bytes:
     """Compress ``data``. Returns compressed data."""
-    
-    if method in (8, 9):
-        if level == 'Fast':
-            level_value = 3
-        elif level == 'Normal':
-            level_value = 6
-        elif level == 'Maximum':
-            level_value = 12
-        else:
-            raise ValueError(f'Unknown compression level {level}.')
-        return deflate.deflate_compress(data, level_value)
-    # elif compression_method == 10:
-    #     compression_method = 'PKWARE Data Compression Library Imploding'
-    #     contents = pwexplode.explode(contents)  # Untested
-    elif method == 12:
-        return bz2.compress(data)
-    # elif compression_method == 14:
-        # eos = bit_flag[-2]
-        # compression_method = 'LZMA'
-        # contents = lzma.decompress(contents, ???)  # Doesn't work for some reason.
-        # Also don't know how to make it to use EOS.
-        # raise NotImplementedError('LZMA compression is not implemented yet.')
-    # elif method == 19:
-    #     return LZ77_module.compress(data)  # Untested
-    elif method == 93:
-        return zstandard.compress(data)
-    elif method == 95:
-        return xz.compress(data)
-    # elif compression_method == 98:
-        # compression_method = 'PPMd'  # Docs says that only version I, Rev 1 of PPMd is supported
-        # maybe that's the reason it doesn't work
-        # contents = pyppmd.decompress(contents, mem_size=uncompressed_size)
-        # raise NotImplementedError('PPMd compression is not implemented yet.')
-    else:
+
+    compressor = COMPRESSORS.get(method)
+    if compressor is None:
         return data
+    return compressor(data, level)
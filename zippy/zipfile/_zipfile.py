@@ -1,20 +1,76 @@
+from copy import copy
 from dataclasses import dataclass
-from datetime import date, time, datetime
-from typing import BinaryIO, Optional
+from datetime import datetime
+from functools import lru_cache
+from struct import Struct
+from typing import Optional, Iterator
 from os import sep
 
-from .._base_classes import File
+from .._base_classes import BufferReader, Decoder, File, CHUNK_SIZE
 from ..constants import *
 from ..exceptions import *
-from ._zip_algorythms import decrypt, decompress
+from ._zip_algorythms import start_decryption, decompress, get_compression_method, iter_decompress, STREAM_DECOMPRESSORS
+from .utils.ZipEncrypt import ZipDecrypter
 
-@dataclass
+# Fixed-size parts of the headers (without signatures), used to parse and encode them
+LOCAL_HEADER: Struct = Struct('<BBHH2s2sIIIHH')
+DATA_DESCRIPTOR_SIZES: Struct = Struct('<II')
+ZIP64_SIZES: Struct = Struct('<QQ')  # Inside zip64 extra field, after its id and size
+UINT32: Struct = Struct('<I')
+CD_HEADER: Struct = Struct('<BBHHH2s2sIIIHHHH2s4sI')
+CD_END: Struct = Struct('<HHHHIIH')
+
+STREAM_THRESHOLD: int = 8_388_608  # 8 MiB, larger files are extracted in chunks
+
+# Masks of the general purpose bit flag
+FLAG_ENCRYPTED: int = 0x0001
+FLAG_MAXIMUM: int = 0x0002  # Deflate level, marks EOS for LZMA
+FLAG_FAST: int = 0x0004
+FLAG_DATA_DESCRIPTOR: int = 0x0008
+FLAG_UTF8: int = 0x0800  # Language encoding flag (EFS)
+FLAG_MASKED_HEADER: int = 0x2000
+
+@lru_cache(maxsize=4096)
+def decode_dos_datetime(last_mod_time: bytes, last_mod_date: bytes) -> Optional[datetime]:
+    """Convert MS-DOS time and date into datetime. Returns None if they are invalid.
+
+    Archived files often share the same timestamp, so results are cached.
+    """
+
+    t: int = int.from_bytes(last_mod_time, 'little')
+    d: int = int.from_bytes(last_mod_date, 'little')
+    # This conversion is based on java8 source code.
+    try:
+        return datetime((d >> 9) + 1980, (d >> 5) & 0xF, d & 0x1F,
+                        (t >> 11) & 0x1F, (t >> 5) & 0x3F, (t << 1) & 0x3E)
+    except ValueError:
+        return None
+
+@dataclass(slots=True)
+class ZipDecoder(Decoder):
+    """Decrypts and decompresses contents of the zip file. Decrypter should continue after the encryption header."""
+
+    compression_method: int
+    uncompressed_size: int
+    decrypter: Optional[ZipDecrypter]
+    stream: bool
+
+    def decode(self, data: bytes | memoryview) -> bytes | memoryview:
+        if self.decrypter is not None:
+            data = memoryview(copy(self.decrypter).decrypt(data))  # Copied, so it can be started over
+        return decompress(self.compression_method, self.uncompressed_size, data)[1]
+
+    def iter_decode(self, data: bytes | memoryview) -> Iterator[bytes | memoryview]:
+        decrypter = copy(self.decrypter) if self.decrypter is not None else None
+        return iter_decompress(get_compression_method(self.compression_method), data, CHUNK_SIZE, decrypter)
+
+@dataclass(slots=True)
 class FileRaw:
     """Raw file representation. It's uncompressed, not decrypted (if it was)
     and contains data fields that user doesn't need."""
 
     version_needed_to_exctract: int
-    bit_flag: str
+    bit_flag: int
     compression_method: int
     last_mod_time: bytes
     last_mod_date: bytes
@@ -25,38 +81,31 @@ class FileRaw:
     extra_field_length: int
     filename: str
     extra_field: bytes
-    contents: bytes
+    contents: bytes | memoryview
 
     @classmethod
-    def __init_raw__(cls, file: BinaryIO, encoding: str) -> 'FileRaw':
-        version: list[int] = [byte for byte in file.read(2)]
-        version_needed_to_exctract: int = version[0]
-        if version[1] != 0:  # This byte is unused
+    def __init_raw__(cls, file: BufferReader, encoding: str) -> 'FileRaw':
+        (
+            version_needed_to_exctract, unused, bit_flag, compression_method, last_mod_time, last_mod_date,
+            crc, compressed_size, uncompressed_size, filename_length, extra_field_length
+        ) = LOCAL_HEADER.unpack(file.read_view(LOCAL_HEADER.size))
+        if unused != 0:  # This byte is unused
             raise BadFile('Unknown version value')
-        bit_flag: str = "".join("".join(format(bit, '0>8b')[::-1]) for bit in file.read(2))
-        compression_method: int = int.from_bytes(file.read(2), 'little')
-        last_mod_time: bytes = file.read(2)
-        last_mod_date: bytes = file.read(2)
-        crc: int = int.from_bytes(file.read(4), 'little')
-        compressed_size: int = int.from_bytes(file.read(4), 'little')
-        uncompressed_size: int = int.from_bytes(file.read(4), 'little')
-        filename_length: int = int.from_bytes(file.read(2), 'little')
-        extra_field_length: int = int.from_bytes(file.read(2), 'little')
-        filename: str = file.read(filename_length).decode(encoding)
-        extra_field: bytes = file.read(extra_field_length)
+        # Variable-length fields are read at once and sliced
+        tail: memoryview = file.read_view(filename_length + extra_field_length)
+        filename: str = str(tail[:filename_length], encoding)
+        extra_field: bytes = tail[filename_length:].tobytes()
         if compressed_size == 4_294_967_295 and extra_field[:2] == b'\x01\x00':  # zip64
-            uncompressed_size = int.from_bytes(extra_field[4:12], 'little')
-            compressed_size = int.from_bytes(extra_field[12:20], 'little')
-        contents: bytes = file.read(compressed_size)
+            uncompressed_size, compressed_size = ZIP64_SIZES.unpack_from(extra_field, 4)
+        contents: memoryview = file.read_view(compressed_size)  # Not copied from the archive
 
-        if bit_flag[3] == '1':
+        if bit_flag & FLAG_DATA_DESCRIPTOR:  # Sizes and CRC are stored after the contents
             _s: bytes = file.read(4)
             if _s == b'PK\x07\x08':  # This signature is unofficial
                 _s = file.read(4)
-            crc = int.from_bytes(_s, 'little')
-            compressed_size = int.from_bytes(file.read(4), 'little')
-            uncompressed_size = int.from_bytes(file.read(4), 'little')
-        if bit_flag[13] == '1':
+            (crc,) = UINT32.unpack(_s)
+            compressed_size, uncompressed_size = DATA_DESCRIPTOR_SIZES.unpack(file.read_view(DATA_DESCRIPTOR_SIZES.size))
+        if bit_flag & FLAG_MASKED_HEADER:
             raise NotImplementedError('Central Directory decryption is not implemented yet.')
 
         return cls(
@@ -75,45 +124,47 @@ class FileRaw:
             contents
         )
 
+    @property
+    def is_encrypted(self) -> bool:
+        return bool(self.bit_flag & FLAG_ENCRYPTED)
+
+    @property
+    def eos_marker(self) -> bool:
+        return bool(self.bit_flag & FLAG_MAXIMUM)
+
     def decode(self, pwd: Optional[str]) -> File:
         """Convert raw data into its final form. Password is required if archive is encrypted."""
         
-        encryption_method, contents = decrypt(
-            self.bit_flag, self.version_needed_to_exctract, self.crc, pwd, self.contents
+        # Only encryption header is decrypted here, so wrong password is found right away
+        encryption_method, contents, decrypter = start_decryption(
+            self.is_encrypted, self.version_needed_to_exctract, self.crc, pwd, self.contents
         )
     
-        compression_method, contents = decompress(self.compression_method, self.uncompressed_size, contents)
-
-        last_mod_date = int.from_bytes(self.last_mod_date, 'little')
-        last_mod_time = int.from_bytes(self.last_mod_time, 'little')
+        compression_method = get_compression_method(self.compression_method)
+        # Large files are extracted without keeping decompressed contents in memory
+        stream: bool = self.uncompressed_size > STREAM_THRESHOLD and (
+            compression_method == 'Stored' or compression_method in STREAM_DECOMPRESSORS
+        )
 
-        # This conversion is based on java8 source code.
-        try:
-            decoded_last_mod_time = time((last_mod_time >> 11) & 0x1F, (last_mod_time >> 5) & 0x3F,
-                                 (last_mod_time << 1) & 0x3E)
-            decoded_last_mod_date = date((last_mod_date >> 9) + 1980, (last_mod_date >> 5) & 0xF,
-                                 last_mod_date & 0x1F)
-            final_last_mod_time = datetime.combine(decoded_last_mod_date, decoded_last_mod_time)
-        except ValueError:
-            final_last_mod_time = None
+        final_last_mod_time = decode_dos_datetime(self.last_mod_time, self.last_mod_date)
 
         if compression_method in ('Deflate', 'Deflate64'):
             compression_level: ZipLevels
-            match self.bit_flag[1:3]:
-                case '00':
+            match (self.bit_flag >> 1) & 0b11:  # Bits 1 and 2
+                case 0b00:
                     compression_level = 'Normal'
-                case '10':
+                case 0b01:
                     compression_level = 'Maximum'
-                case '01':
+                case 0b10:
                     compression_level = 'Fast'
-                case '11':
+                case 0b11:
                     compression_level = 'Fast'
         else:
             compression_level = 'Normal'
 
-        return File(
+        file = File(
             self.filename.replace('/', sep),
-            self.filename[-1] == '/',
+            self.filename.endswith('/'),
             self.version_needed_to_exctract,
             encryption_method,
             compression_method,
@@ -124,27 +175,26 @@ class FileRaw:
             self.uncompressed_size,
             contents
         )
+        # Contents are decompressed on first access
+        file._defer(ZipDecoder(self.compression_method, self.uncompressed_size, decrypter, stream))
+        return file
 
     def encode(self, encoding: str) -> bytes:
         """Convert raw data into bytes. Encoding is used to encode filename and comment."""
-        byte_str: bytes = b'PK\x03\x04'
-        byte_str += self.version_needed_to_exctract.to_bytes(2, 'little')
-        byte_str += int(self.bit_flag[::-1], 2).to_bytes(2, 'little')
-        byte_str += self.compression_method.to_bytes(2, 'little')
-        byte_str += self.last_mod_time
-        byte_str += self.last_mod_date
-        byte_str += self.crc.to_bytes(4, 'little')
-        byte_str += self.compressed_size.to_bytes(4, 'little')
-        byte_str += self.uncompressed_size.to_bytes(4, 'little')
-        byte_str += self.filename_length.to_bytes(2, 'little')
-        byte_str += self.extra_field_length.to_bytes(2, 'little')
-        byte_str += self.filename.encode(encoding)
-        byte_str += self.extra_field
-        byte_str += self.contents
-        return byte_str
-
-
-@dataclass
+        return b''.join((
+            b'PK\x03\x04',
+            LOCAL_HEADER.pack(
+                self.version_needed_to_exctract, 0, self.bit_flag, self.compression_method, self.last_mod_time,
+                self.last_mod_date, self.crc, self.compressed_size, self.uncompressed_size,
+                self.filename_length, self.extra_field_length
+            ),
+            self.filename.encode(encoding),
+            self.extra_field,
+            self.contents
+        ))
+
+
+@dataclass(slots=True)
 class CDHeader:
     """Contents of Central Directory Header.
     See https://pkware.cachefly.net/webdocs/casestudies/APPNOTE.TXT for full documentation.
@@ -153,7 +203,7 @@ class CDHeader:
     version_made_by: int
     platform: int
     version_needed_to_exctract: int
-    bit_flag: str
+    bit_flag: int
     compression_method: int
     last_mod_time: bytes
     last_mod_date: bytes
@@ -172,30 +222,20 @@ class CDHeader:
     comment: str
 
     @classmethod
-    def __init_raw__(cls, file: BinaryIO, encoding: str) -> 'CDHeader':
-        version_made_by = int.from_bytes(file.read(1), 'little')
-        platform = int.from_bytes(file.read(1), 'little')
-        version_needed_to_exctract = int.from_bytes(file.read(2), 'little')
-        bit_flag = "".join("".join(format(bit, '0>8b')[::-1]) for bit in file.read(2))
-        compression_method = int.from_bytes(file.read(2), 'little')
-        last_mod_time = file.read(2)
-        last_mod_date = file.read(2)
-        crc = int.from_bytes(file.read(4), 'little')
-        compressed_size = int.from_bytes(file.read(4), 'little')
-        uncompressed_size = int.from_bytes(file.read(4), 'little')
-        file_name_length = int.from_bytes(file.read(2), 'little')
-        extra_field_length = int.from_bytes(file.read(2), 'little')
-        file_comment_length = int.from_bytes(file.read(2), 'little')
-        disk_number_start = int.from_bytes(file.read(2), 'little')
-        internal_file_attrs = file.read(2)
-        external_file_attrs = file.read(4)
-        local_header_relative_offset = int.from_bytes(file.read(4), 'little')
-        filename = file.read(file_name_length).decode(encoding)
-        extra_field = file.read(extra_field_length)
+    def __init_raw__(cls, file: BufferReader, encoding: str) -> 'CDHeader':
+        (
+            version_made_by, platform, version_needed_to_exctract, bit_flag, compression_method,
+            last_mod_time, last_mod_date, crc, compressed_size, uncompressed_size, file_name_length,
+            extra_field_length, file_comment_length, disk_number_start, internal_file_attrs,
+            external_file_attrs, local_header_relative_offset
+        ) = CD_HEADER.unpack(file.read_view(CD_HEADER.size))
+        # Variable-length fields are read at once and sliced
+        tail: memoryview = file.read_view(file_name_length + extra_field_length + file_comment_length)
+        filename: str = str(tail[:file_name_length], encoding)
+        extra_field: bytes = tail[file_name_length:file_name_length + extra_field_length].tobytes()
         if compressed_size == 4_294_967_295 and extra_field[:2] == b'\x01\x00':  # zip64
-            uncompressed_size = int.from_bytes(extra_field[4:12], 'little')
-            compressed_size = int.from_bytes(extra_field[12:20], 'little')
-        file_comment = file.read(file_comment_length).decode(encoding)
+            uncompressed_size, compressed_size = ZIP64_SIZES.unpack_from(extra_field, 4)
+        file_comment: str = str(tail[file_name_length + extra_field_length:], encoding)
 
         return cls(
             version_made_by,
@@ -220,33 +260,29 @@ class CDHeader:
             file_comment
         )
 
+    @property
+    def size(self) -> int:
+        """Length of the encoded header, counted without encoding it."""
+        return 4 + CD_HEADER.size + self.filename_length + self.extra_field_length + self.comment_length
+
     def encode(self, encoding: str) -> bytes:
         """Convert raw data into bytes. Encoding is used to encode filename and comment."""
-        byte_str: bytes = b'PK\x01\x02'
-        byte_str += self.version_made_by.to_bytes(1, 'little')
-        byte_str += self.platform.to_bytes(1, 'little')
-        byte_str += self.version_needed_to_exctract.to_bytes(2, 'little')
-        byte_str += int(self.bit_flag[::-1], 2).to_bytes(2, 'little')
-        byte_str += self.compression_method.to_bytes(2, 'little')
-        byte_str += self.last_mod_time
-        byte_str += self.last_mod_date
-        byte_str += self.crc.to_bytes(4, 'little')
-        byte_str += self.compressed_size.to_bytes(4, 'little')
-        byte_str += self.uncompressed_size.to_bytes(4, 'little')
-        byte_str += self.filename_length.to_bytes(2, 'little')
-        byte_str += self.extra_field_length.to_bytes(2, 'little')
-        byte_str += self.comment_length.to_bytes(2, 'little')
-        byte_str += self.disk_number_start.to_bytes(2, 'little')
-        byte_str += self.internal_file_attrs
-        byte_str += self.external_file_attrs
-        byte_str += self.local_header_relative_offset.to_bytes(4, 'little')
-        byte_str += self.filename.encode(encoding)
-        byte_str += self.extra_field
-        byte_str += self.comment.encode(encoding)
-        return byte_str
-
-
-@dataclass
+        return b''.join((
+            b'PK\x01\x02',
+            CD_HEADER.pack(
+                self.version_made_by, self.platform, self.version_needed_to_exctract, self.bit_flag,
+                self.compression_method, self.last_mod_time, self.last_mod_date, self.crc, self.compressed_size,
+                self.uncompressed_size, self.filename_length, self.extra_field_length, self.comment_length,
+                self.disk_number_start, self.internal_file_attrs, self.external_file_attrs,
+                self.local_header_relative_offset
+            ),
+            self.filename.encode(encoding),
+            self.extra_field,
+            self.comment.encode(encoding)
+        ))
+
+
+@dataclass(slots=True)
 class CDEnd:
     """Contents of End of Central Directory.
     See https://pkware.cachefly.net/webdocs/casestudies/APPNOTE.TXT for full documentation.
@@ -262,14 +298,10 @@ class CDEnd:
     comment: str
 
     @classmethod
-    def __init_raw__(cls, file: BinaryIO, encoding: str) -> 'CDEnd':
-        disk_num = int.from_bytes(file.read(2), 'little')
-        disk_num_CD = int.from_bytes(file.read(2), 'little')
-        total_entries = int.from_bytes(file.read(2), 'little')
-        total_CD_entries = int.from_bytes(file.read(2), 'little')
-        sizeof_CD = int.from_bytes(file.read(4), 'little')
-        offset = int.from_bytes(file.read(4), 'little')
-        comment_length = int.from_bytes(file.read(2), 'little')
+    def __init_raw__(cls, file: BufferReader, encoding: str) -> 'CDEnd':
+        (
+            disk_num, disk_num_CD, total_entries, total_CD_entries, sizeof_CD, offset, comment_length
+        ) = CD_END.unpack(file.read_view(CD_END.size))
         comment = file.read(comment_length).decode(encoding)
 
         return cls(
@@ -285,13 +317,11 @@ class CDEnd:
 
     def encode(self, encoding: str) -> bytes:
         """Convert raw data into bytes. Encoding is used to encode comment."""
-        byte_str: bytes = b'PK\x05\x06'
-        byte_str += self.disk_num.to_bytes(2, 'little')
-        byte_str += self.disk_num_CD.to_bytes(2, 'little')
-        byte_str += self.total_entries.to_bytes(2, 'little')
-        byte_str += self.total_CD_entries.to_bytes(2, 'little')
-        byte_str += self.sizeof_CD.to_bytes(4, 'little')
-        byte_str += self.offset.to_bytes(4, 'little')
-        byte_str += self.comment_length.to_bytes(2, 'little')
-        byte_str += self.comment.encode(encoding)
-        return byte_str
+        return b''.join((
+            b'PK\x05\x06',
+            CD_END.pack(
+                self.disk_num, self.disk_num_CD, self.total_entries, self.total_CD_entries,
+                self.sizeof_CD, self.offset, self.comment_length
+            ),
+            self.comment.encode(encoding)
+        ))
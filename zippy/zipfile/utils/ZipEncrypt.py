@@ -31,7 +31,7 @@ class ZipDecrypter:
     Usage:
         zd = ZipDecrypter(mypwd)
         plain_char = zd(cypher_char)
-        plain_text = map(zd, cypher_text)
+        plain_text = zd.decrypt(cypher_text)
     """
 
     @staticmethod
@@ -57,7 +57,7 @@ class ZipDecrypter:
         return ((crc >> 8) & 0xffffff) ^ self.crctable[(crc ^ ch) & 0xff]
 
     def __init__(self, pwd: str):
-        self.crctable = self.generate_crc_table()
+        self.crctable = CRC_TABLE
         self.key0 = 305419896
         self.key1 = 591751049
         self.key2 = 878082192
@@ -77,6 +77,25 @@ class ZipDecrypter:
         self.update_keys(c)
         return c.to_bytes(byteorder='little')
 
+    def decrypt(self, data: bytes | memoryview) -> bytearray:
+        """Decrypt the whole buffer at once."""
+        # Same as calling self for every character, but keys are kept in local variables
+        crctable = self.crctable
+        key0, key1, key2 = self.key0, self.key1, self.key2
+        result = bytearray(len(data))
+        for i, c in enumerate(data):
+            k = key2 | 2
+            c ^= ((k * (k ^ 1)) >> 8) & 255
+            result[i] = c
+            key0 = (key0 >> 8) ^ crctable[(key0 ^ c) & 0xff]
+            key1 = ((key1 + (key0 & 255)) * 134775813 + 1) & 4294967295
+            key2 = (key2 >> 8) ^ crctable[(key2 ^ (key1 >> 24)) & 0xff]
+        self.key0, self.key1, self.key2 = key0, key1, key2
+        return result
+
+# Table is the same for every password, so it's generated once
+CRC_TABLE: list[int] = ZipDecrypter.generate_crc_table()
+
 class ZipEncrypter(ZipDecrypter):
     def __call__(self, c: int) -> bytes:
         """Encrypt a single character."""
@@ -85,3 +104,17 @@ class ZipEncrypter(ZipDecrypter):
         c = c ^ (((k * (k ^ 1)) >> 8) & 255)
         self.update_keys(_c)  # this is the only line that actually changed
         return c.to_bytes(byteorder='little')
+
+    def encrypt(self, data: bytes | memoryview) -> bytearray:
+        """Encrypt the whole buffer at once."""
+        crctable = self.crctable
+        key0, key1, key2 = self.key0, self.key1, self.key2
+        result = bytearray(len(data))
+        for i, c in enumerate(data):
+            k = key2 | 2
+            result[i] = c ^ (((k * (k ^ 1)) >> 8) & 255)
+            key0 = (key0 >> 8) ^ crctable[(key0 ^ c) & 0xff]  # Keys are updated with plain character
+            key1 = ((key1 + (key0 & 255)) * 134775813 + 1) & 4294967295
+            key2 = (key2 >> 8) ^ crctable[(key2 ^ (key1 >> 24)) & 0xff]
+        self.key0, self.key1, self.key2 = key0, key1, key2
+        return result
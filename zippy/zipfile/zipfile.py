@@ -7,10 +7,10 @@ from platform import system
 from typing import BinaryIO, TextIO, Optional
 from zlib import crc32
 
-from .._base_classes import Archive, File, NewArchive
+from .._base_classes import Archive, BufferReader, File, NewArchive
 from ..constants import *
 from ..exceptions import *
-from ._zipfile import FileRaw, CDHeader, CDEnd
+from ._zipfile import FileRaw, CDHeader, CDEnd, FLAG_ENCRYPTED, FLAG_FAST, FLAG_MAXIMUM, FLAG_UTF8
 from ._zip_algorythms import compress, encrypt
 
 INT32_MAX: int = 4_294_967_295
@@ -93,17 +93,7 @@ class NewZipFile(NewArchive):
             filename = os_path.basename(path)
             file_path = os_path.dirname(path)
 
-        data: bytes
-        if isinstance(contents, TextIO):
-            data = contents.read().encode(encoding)
-        elif isinstance(contents, BinaryIO):
-            data = contents.read()
-        elif isinstance(contents, str):
-            data = contents.encode(encoding)
-        elif isinstance(contents, bytes):
-            data = contents
-        else:
-            raise TypeError(f"Expected argument content to be str, bytes, io.TextIO or io.BinaryIO, not {type(contents).__name__}.")
+        data: bytes = self._coerce_contents(contents, encoding)
 
         if file_path != '':
             self.create_folder(file_path, encoding)
@@ -119,7 +109,7 @@ class NewZipFile(NewArchive):
 
         v: int = 10
 
-        if compression == 'Deflate' or filename[-1] == '/' or self._encryption == 'ZipCrypto':
+        if compression == 'Deflate' or filename.endswith('/') or self._encryption == 'ZipCrypto':
             v = 20
         if compression == 'Deflate64':
             v = 21
@@ -130,12 +120,12 @@ class NewZipFile(NewArchive):
         if compression == 'BZIP2':
             v = 46
 
-        bit_flag: list[str] = list('0000000000000000')
+        bit_flag: int = 0
 
         if all([encoding == 'utf-8', data != b'', not data.isascii()]):
             try:
                 data.decode('utf-8')
-                bit_flag[11] = '1'  # Language encoding flag (EFS)
+                bit_flag |= FLAG_UTF8
             except UnicodeDecodeError:
                 pass
 
@@ -143,13 +133,13 @@ class NewZipFile(NewArchive):
         data = compress(compression_method, level, data)
 
         if self._encryption != 'Unencrypted':
-            bit_flag[0] = '1'
+            bit_flag |= FLAG_ENCRYPTED
             data = encrypt(data, self._pwd, crc)
         if compression in (DEFLATE, DEFLATE64):
             if level == FAST:
-                bit_flag[2] = '1'
+                bit_flag |= FLAG_FAST
             elif level == MAXIMUM:
-                bit_flag[1] = '1'
+                bit_flag |= FLAG_MAXIMUM
 
         compressed_size: int = len(data)
         f_extra_field: bytes = b''
@@ -164,7 +154,7 @@ class NewZipFile(NewArchive):
             uncompressed_size = INT32_MAX
             compressed_size = INT32_MAX
         
-        if filename[-1] == '/':
+        if filename.endswith('/'):
             external_attrs = 0x10  # Directory
         else:
             external_attrs = 0x20  # Archive
@@ -179,16 +169,17 @@ class NewZipFile(NewArchive):
         else:
             raise NotImplementedError(f"Unsupported platform '{pl}'")
 
+        filename_length: int = len(filename.encode(self._encoding))
         file = FileRaw(
             version_needed_to_exctract=v,
-            bit_flag="".join(bit_flag),
+            bit_flag=bit_flag,
             compression_method=compression_method,
             last_mod_time=time.to_bytes(4, 'little')[:2],
             last_mod_date=time.to_bytes(4, 'little')[2:],
             crc=crc,
             compressed_size=compressed_size,
             uncompressed_size=uncompressed_size,
-            filename_length=len(filename.encode(self._encoding)),
+            filename_length=filename_length,
             extra_field_length=len(f_extra_field),
             filename=filename,
             extra_field=f_extra_field,
@@ -201,14 +192,14 @@ class NewZipFile(NewArchive):
             version_made_by=63,
             platform=platform,
             version_needed_to_exctract=v,
-            bit_flag="".join(bit_flag),
+            bit_flag=bit_flag,
             compression_method=compression_method,
             last_mod_time=time.to_bytes(4, 'little')[:2],
             last_mod_date=time.to_bytes(4, 'little')[2:],
             crc=crc,
             compressed_size=compressed_size,
             uncompressed_size=uncompressed_size,
-            filename_length=len(filename.encode(self._encoding)),
+            filename_length=filename_length,
             extra_field_length=0,
             comment_length=len(comment.encode(self._encoding)),
             disk_number_start=0,
@@ -221,9 +212,9 @@ class NewZipFile(NewArchive):
         )
 
         if file.filename in self._files:
-            self._sizeof_CD -= len(self._cd_headers[file.filename].encode(self._encoding))
+            self._sizeof_CD -= self._cd_headers[file.filename].size
 
-        self._sizeof_CD += len(cd_header.encode(self._encoding))
+        self._sizeof_CD += cd_header.size
 
         self._files[file.filename] = file
         self._cd_headers[file.filename] = cd_header
@@ -312,7 +303,7 @@ class NewZipFile(NewArchive):
 
         v: int = 10
 
-        if compression == 'Deflate' or filename[-1] == '/' or self._encryption == 'ZipCrypto':
+        if compression == 'Deflate' or filename.endswith('/') or self._encryption == 'ZipCrypto':
             v = 20
         if compression == 'Deflate':
             v = 21
@@ -323,12 +314,12 @@ class NewZipFile(NewArchive):
         if compression == 'BZIP2':
             v = 46
 
-        bit_flag: list[str] = list('0000000000000000')
+        bit_flag: int = 0
 
         if all([encoding == 'utf-8', data != b'', not data.isascii()]):
             try:
                 data.decode('utf-8')
-                bit_flag[11] = '1'  # Language encoding flag (EFS)
+                bit_flag |= FLAG_UTF8
             except UnicodeDecodeError:
                 pass
 
@@ -336,13 +327,13 @@ class NewZipFile(NewArchive):
         data = compress(compression_method, level, data)
 
         if self._encryption != 'Unencrypted':
-            bit_flag[0] = '1'
+            bit_flag |= FLAG_ENCRYPTED
             data = encrypt(data, self._pwd, crc)
         if compression in (DEFLATE, DEFLATE64):
             if level == FAST:
-                bit_flag[2] = '1'
+                bit_flag |= FLAG_FAST
             elif level == MAXIMUM:
-                bit_flag[1] = '1'
+                bit_flag |= FLAG_MAXIMUM
 
         compressed_size: int = len(data)
 
@@ -408,16 +399,17 @@ class NewZipFile(NewArchive):
         else:
             raise NotImplementedError(f"Unsupported platform: '{pl}'")
 
+        filename_length: int = len(filename.encode(self._encoding))
         file = FileRaw(
             version_needed_to_exctract=v,
-            bit_flag="".join(bit_flag),
+            bit_flag=bit_flag,
             compression_method=compression_method,
             last_mod_time=time.to_bytes(4, 'little')[:2],
             last_mod_date=time.to_bytes(4, 'little')[2:],
             crc=crc,
             compressed_size=compressed_size,
             uncompressed_size=uncompressed_size,
-            filename_length=len(filename.encode(self._encoding)),
+            filename_length=filename_length,
             extra_field_length=len(f_extra_field),
             filename=filename,
             extra_field=f_extra_field,
@@ -430,14 +422,14 @@ class NewZipFile(NewArchive):
             version_made_by=63,
             platform=platform,
             version_needed_to_exctract=v,
-            bit_flag="".join(bit_flag),
+            bit_flag=bit_flag,
             compression_method=compression_method,
             last_mod_time=time.to_bytes(4, 'little')[:2],
             last_mod_date=time.to_bytes(4, 'little')[2:],
             crc=crc,
             compressed_size=compressed_size,
             uncompressed_size=uncompressed_size,
-            filename_length=len(filename.encode(self._encoding)),
+            filename_length=filename_length,
             extra_field_length=len(h_extra_field),
             comment_length=len(comment.encode(self._encoding)),
             disk_number_start=0,
@@ -450,9 +442,9 @@ class NewZipFile(NewArchive):
         )
 
         if file.filename in self._files:
-            self._sizeof_CD -= len(self._cd_headers[file.filename].encode(self._encoding))
+            self._sizeof_CD -= self._cd_headers[file.filename].size
 
-        self._sizeof_CD += len(cd_header.encode(self._encoding))
+        self._sizeof_CD += cd_header.size
 
         self._files[file.filename] = file
         self._cd_headers[file.filename] = cd_header
@@ -521,42 +513,36 @@ class NewZipFile(NewArchive):
         if path != '':
             self.create_folder(path, encoding)
 
-        files: list[tuple[Path, str, ZipCompressions, ZipLevels, str, str, str, Optional[str]]] = []
-    
-        def get_all_files(current_root: Path) -> None:
-            nonlocal files
-
-            for file in current_root.iterdir():
-                # Initial fd is the path of the folder being added. Used to get data of files inside it.
-                # fp is additional folder inside zip content will be added to.
-                
-                final_path: str = str(Path(path).joinpath(file.relative_to(root)))
-
-                if file.is_dir():
-                    files.append(
-                        (file, final_path + '/', 'Stored', 'Normal', 'utf-8', comment, self._encryption, self._pwd)
-                    )
-                    get_all_files(file)
-                else:
-                    files.append(
-                        (file, final_path, compression, level, encoding, comment, self._encryption, self._pwd)
-                    )
-
         if isinstance(source, (bytes, PathLike)):
-            root: Path = Path(str(source))
+            root: str = str(source)
         elif isinstance(source, str):
-            root = Path(source)
+            root = source
         else:
             raise TypeError(f"Expected argument source to be str, bytes or os.PathLike, not {type(source).__name__}")
 
-        get_all_files(root)
+        files: list[tuple[str, str, ZipCompressions, ZipLevels, str, str, str, Optional[str]]] = []
+
+        for file, relative_path, is_dir in self._iter_tree(root):
+            # Initial fd is the path of the folder being added. Used to get data of files inside it.
+            # fp is additional folder inside zip content will be added to.
+
+            final_path: str = str(Path(path).joinpath(relative_path))
+
+            if is_dir:
+                files.append(
+                    (file, final_path + '/', 'Stored', 'Normal', 'utf-8', comment, self._encryption, self._pwd)
+                )
+            else:
+                files.append(
+                    (file, final_path, compression, level, encoding, comment, self._encryption, self._pwd)
+                )
 
         if len(files) >= 36 and use_mp:
             with Pool(cpu_count()) as pool:
                 for result in pool.starmap(self._mp_add_file, files):
                     for path in result[0].keys():
                         if path in self._files:
-                            self._sizeof_CD -= len(self._cd_headers[path].encode(self._encoding))
+                            self._sizeof_CD -= self._cd_headers[path].size
                     self._files.update(result[0])
                     self._cd_headers.update(result[1])
                     self._sizeof_CD += result[2]
@@ -691,12 +677,12 @@ class NewZipFile(NewArchive):
         if compression == BZIP:
             v = 46
         
-        bit_flag: list[str] = list('0000000000000000')
+        bit_flag: int = 0
 
         if all([encoding == 'utf-8', data != b'', not data.isascii()]):
             try:
                 data.decode('utf-8')
-                bit_flag[11] = '1'  # Language encoding flag (EFS)
+                bit_flag |= FLAG_UTF8
             except UnicodeDecodeError:
                 pass
 
@@ -704,13 +690,13 @@ class NewZipFile(NewArchive):
         data = compress(compression_method, level, data)
 
         if encryption != 'Unencrypted':
-            bit_flag[0] = '1'
+            bit_flag |= FLAG_ENCRYPTED
             data = encrypt(data, pwd, crc)
         if compression in ('Deflate', 'Deflate64'):
             if level == FAST:
-                bit_flag[2] = '1'
+                bit_flag |= FLAG_FAST
             elif level == MAXIMUM:
-                bit_flag[1] = '1'
+                bit_flag |= FLAG_MAXIMUM
 
         compressed_size: int = len(data)
 
@@ -769,16 +755,17 @@ class NewZipFile(NewArchive):
             raise NotImplementedError(f"Unsupported platform: '{pl}'")
         
 
+        filename_length: int = len(filename.encode(encoding))
         file = FileRaw(
             version_needed_to_exctract=v,
-            bit_flag="".join(bit_flag),
+            bit_flag=bit_flag,
             compression_method=compression_method,
             last_mod_time=time.to_bytes(4, 'little')[:2],
             last_mod_date=time.to_bytes(4, 'little')[2:],
             crc=crc,
             compressed_size=compressed_size,
             uncompressed_size=uncompressed_size,
-            filename_length=len(filename.encode(encoding)),
+            filename_length=filename_length,
             extra_field_length=len(f_extra_field),
             filename=filename,
             extra_field=f_extra_field,
@@ -791,14 +778,14 @@ class NewZipFile(NewArchive):
             version_made_by=63,
             platform=platform,
             version_needed_to_exctract=v,
-            bit_flag="".join(bit_flag),
+            bit_flag=bit_flag,
             compression_method=compression_method,
             last_mod_time=time.to_bytes(4, 'little')[:2],
             last_mod_date=time.to_bytes(4, 'little')[2:],
             crc=crc,
             compressed_size=compressed_size,
             uncompressed_size=uncompressed_size,
-            filename_length=len(filename.encode(encoding)),
+            filename_length=filename_length,
             extra_field_length=len(h_extra_field),
             comment_length=len(comment.encode(encoding)),
             disk_number_start=0,
@@ -810,7 +797,7 @@ class NewZipFile(NewArchive):
             comment=comment
         )
 
-        return {file.filename: file}, {file.filename: cd_header}, len(cd_header.encode(encoding))
+        return {file.filename: file}, {file.filename: cd_header}, cd_header.size
 
 class ZipFile(Archive):
     """Class representing the zip file and its contents. Use one of the static methods to initialise it."""
@@ -838,41 +825,43 @@ class ZipFile(Archive):
         indirect: bool = False
 
         if isinstance(f, (int, str, bytes, PathLike)):
-            f = open(f, 'rb')
+            f = open(f, 'rb', buffering=0)  # Read once, so no extra buffer is needed
             indirect = True
         elif not isinstance(f, BinaryIO):
             raise TypeError(f"Expected argument f to be int, str, bytes or os.PathLike object, got '{type(f).__name__}' instead.")
 
+        # Archive is read at once and files refer to its parts instead of copying them
         try:
-            signature: bytes = f.read(4)
-            if signature == b'PK\x03\x04':  # First check
-                raw_file = FileRaw.__init_raw__(f, encoding)
-                files.append(raw_file.decode(pwd))
-            elif signature == b'PK\x05\x06': # Empty zip file
-                endof_cd = CDEnd.__init_raw__(f, encoding)
-                return ZipFile(files, CD_headers, endof_cd, encoding)
-            else:
-                raise BadFile('File should be in .ZIP format.')
-
-            while True:
-                signature = f.read(4)
-                if signature == b'PK\x03\x04':  # Getting file headers
-                    raw_file = FileRaw.__init_raw__(f, encoding)
-                    files.append(raw_file.decode(pwd))
-                elif signature == b'PK\x01\x02':  # Getting central directory headers
-                    header = CDHeader.__init_raw__(f, encoding)
-                    CD_headers.append(header)
-                elif signature == b'PK\x05\x06':  # End of centeral directory (stop reading)
-                    endof_cd = CDEnd.__init_raw__(f, encoding)
-                    break
+            reader = BufferReader(f.read())
         finally:
             if indirect:
                 f.close()
 
-        # Making sure zip file is not damaged
+        signature: bytes = reader.read(4)
+        if signature == b'PK\x03\x04':  # First check
+            raw_file = FileRaw.__init_raw__(reader, encoding)
+            files.append(raw_file.decode(pwd))
+        elif signature == b'PK\x05\x06': # Empty zip file
+            endof_cd = CDEnd.__init_raw__(reader, encoding)
+            return ZipFile(files, CD_headers, endof_cd, encoding)
+        else:
+            raise BadFile('File should be in .ZIP format.')
+
+        while True:
+            signature = reader.read(4)
+            if signature == b'PK\x03\x04':  # Getting file headers
+                raw_file = FileRaw.__init_raw__(reader, encoding)
+                files.append(raw_file.decode(pwd))
+            elif signature == b'PK\x01\x02':  # Getting central directory headers
+                header = CDHeader.__init_raw__(reader, encoding)
+                CD_headers.append(header)
+            elif signature == b'PK\x05\x06':  # End of centeral directory (stop reading)
+                endof_cd = CDEnd.__init_raw__(reader, encoding)
+                break
+
+        # Making sure zip file is not damaged. Contents are checked on first access.
         for file, header in zip(files, CD_headers):
-            crc = crc32(file.contents)
-            if file.crc != crc or header.crc != crc:
+            if file.crc != header.crc:
                 raise BadFile('File is corrupted or damaged.')
             file.comment = header.comment  # Can't reach comment in first processing
 